@@ -0,0 +1,399 @@
+import hashlib
+from math import pi
+import numba as nb
+import numpy as np
+from typing import Tuple
+
+from celestial_body import G
+
+
+# Coefficients of the previous stage's increment at which each RK4 stage is 
+# evaluated.
+_RK4_C = np.array([0.0, 0.5, 0.5, 1.0])
+# Weights of each RK4 stage's increment in the step.
+_RK4_W = np.array([1.0, 2.0, 2.0, 1.0])
+# Below this many planets, computing the forces serially with Newton's third 
+# law is faster than spreading them across threads. The step kernels run the 
+# parallel loop over _planet_accel themselves: calling a separate parallel 
+# kernel from them fails to link once that kernel is loaded from Numba's cache. 
+# Only the force loop is parallel: the O(N) elementwise updates are too cheap 
+# to be worth a parallel launch, and would pay for one on every step.
+PARALLEL_MIN_PLANETS = 64
+
+
+def source_hash() -> int:
+    """
+    Computes a hash of this module's source, used to tell whether kernels 
+    compiled ahead of time by compile_kernels.py were built from it.
+
+    Returns
+    -------
+    - h (int): The first 60 bits of the SHA-256 digest of this file.
+    """
+
+    with open(__file__, "rb") as source:
+        return int(hashlib.sha256(source.read()).hexdigest()[:15], 16)
+
+
+@nb.njit(fastmath=True, cache=True)
+def _pull(pos: np.array, other: np.array, mass: float, acc: np.array):
+    """
+    Adds the acceleration due to gravity toward another body to an 
+    acceleration vector.
+
+    Parameters
+    ----------
+    - pos (1-d array): A 3-d vector of the position of the accelerated body.
+    - other (1-d array): A 3-d vector of the position of the other body.
+    - mass (float): The mass of the other body.
+    - acc (1-d array): The 3-d acceleration vector to add to.
+    """
+
+    dx = pos[0] - other[0]
+    dy = pos[1] - other[1]
+    dz = pos[2] - other[2]
+    r2 = dx * dx + dy * dy + dz * dz
+    inv_r = 1.0 / np.sqrt(r2)
+    f = G * mass * inv_r * inv_r * inv_r
+    acc[0] -= f * dx
+    acc[1] -= f * dy
+    acc[2] -= f * dz
+
+
+@nb.njit(fastmath=True, cache=True)
+def g(index: int, pos: np.array, pos_all: np.array, mass_all: np.array)\
+    -> np.array:
+    """
+    Computes the acceleration due to gravity on a given body as a combination 
+    of many other celestial bodies.
+
+    Parameters
+    ----------
+    - index (int): The index of the celestial body whose acceleration is to be 
+    computed.
+    - pos (1-d array): A 3-d vector of the position of the body at index i.
+    - pos_all (2-d array): An (N, 3) array of the positions of all the bodies 
+    in the system.
+    - mass_all (1-d array): An array of length N of the masses of all the 
+    bodies in the system.
+
+    Returns
+    -------
+    - g (1-d array): The acceleration vector of main.
+    """
+
+    g = np.zeros(3)
+    # Sum the pulls of the bodies before and after main, skipping main itself.
+    for j in range(index):
+        _pull(pos, pos_all[j], mass_all[j], g)
+    for j in range(index + 1, pos_all.shape[0]):
+        _pull(pos, pos_all[j], mass_all[j], g)
+
+    return g
+
+
+@nb.njit(fastmath=True, cache=True)
+def _accel_planets(star_pos: np.array, mu_star: float, pos: np.array,\
+    mass: np.array, acc: np.array):
+    """
+    Computes the acceleration due to gravity on every planet in the system as 
+    the pull of the central star plus the pulls of the planets on one another. 
+    The force between each pair of planets is computed once and applied to 
+    both, per Newton's third law.
+
+    Parameters
+    ----------
+    - star_pos (1-d array): A 3-d vector of the position of the central star.
+    - mu_star (float): The standard gravitational parameter of the star.
+    - pos (2-d array): An (M, 3) array of the positions of the planets.
+    - mass (1-d array): An array of length M of the masses of the planets.
+    - acc (2-d array): An (M, 3) array the accelerations are written into.
+    """
+
+    m = pos.shape[0]
+
+    # Pull of the central star.
+    for i in range(m):
+        dx = pos[i, 0] - star_pos[0]
+        dy = pos[i, 1] - star_pos[1]
+        dz = pos[i, 2] - star_pos[2]
+        r2 = dx * dx + dy * dy + dz * dz
+        inv_r = 1.0 / np.sqrt(r2)
+        f = mu_star * inv_r * inv_r * inv_r
+        acc[i, 0] = -f * dx
+        acc[i, 1] = -f * dy
+        acc[i, 2] = -f * dz
+
+    # Pulls of the planets on one another.
+    for i in range(m):
+        for j in range(i + 1, m):
+            dx = pos[i, 0] - pos[j, 0]
+            dy = pos[i, 1] - pos[j, 1]
+            dz = pos[i, 2] - pos[j, 2]
+            r2 = dx * dx + dy * dy + dz * dz
+            inv_r = 1.0 / np.sqrt(r2)
+            inv_r3 = inv_r * inv_r * inv_r
+            fx = G * inv_r3 * dx
+            fy = G * inv_r3 * dy
+            fz = G * inv_r3 * dz
+            acc[i, 0] -= fx * mass[j]
+            acc[i, 1] -= fy * mass[j]
+            acc[i, 2] -= fz * mass[j]
+            acc[j, 0] += fx * mass[i]
+            acc[j, 1] += fy * mass[i]
+            acc[j, 2] += fz * mass[i]
+
+
+@nb.njit(fastmath=True, cache=True)
+def _pull_components(pos: np.array, i: int, j: int, mass: float)\
+    -> Tuple[float, float, float]:
+    """
+    Computes the acceleration due to gravity of one body toward another.
+
+    Parameters
+    ----------
+    - pos (2-d array): An (N, 3) array of the positions of the bodies.
+    - i (int): The index of the accelerated body.
+    - j (int): The index of the body pulling on it.
+    - mass (float): The mass of the body at index j.
+
+    Returns
+    -------
+    - ax, ay, az (floats): The components of the acceleration.
+    """
+
+    dx = pos[i, 0] - pos[j, 0]
+    dy = pos[i, 1] - pos[j, 1]
+    dz = pos[i, 2] - pos[j, 2]
+    r2 = dx * dx + dy * dy + dz * dz
+    inv_r = 1.0 / np.sqrt(r2)
+    f = G * mass * inv_r * inv_r * inv_r
+
+    return -f * dx, -f * dy, -f * dz
+
+
+@nb.njit(fastmath=True, cache=True)
+def _planet_accel(i: int, star_pos: np.array, mu_star: float, pos: np.array,\
+    mass: np.array, acc: np.array):
+    """
+    Computes the acceleration due to gravity on a single planet, writing only 
+    that planet's row of the output so it can run in parallel across planets. 
+    Pairwise forces are not shared between the two planets as in 
+    _accel_planets, since the other planet's row may belong to another thread.
+
+    Parameters
+    ----------
+    - i (int): The index of the planet whose acceleration is to be computed.
+    - star_pos (1-d array): A 3-d vector of the position of the central star.
+    - mu_star (float): The standard gravitational parameter of the star.
+    - pos (2-d array): An (M, 3) array of the positions of the planets.
+    - mass (1-d array): An array of length M of the masses of the planets.
+    - acc (2-d array): An (M, 3) array the acceleration is written into.
+    """
+
+    # Pull of the central star.
+    dx = pos[i, 0] - star_pos[0]
+    dy = pos[i, 1] - star_pos[1]
+    dz = pos[i, 2] - star_pos[2]
+    r2 = dx * dx + dy * dy + dz * dz
+    inv_r = 1.0 / np.sqrt(r2)
+    f = mu_star * inv_r * inv_r * inv_r
+    ax = -f * dx
+    ay = -f * dy
+    az = -f * dz
+    # Pulls of the planets before and after this one.
+    for j in range(i):
+        fx, fy, fz = _pull_components(pos, i, j, mass[j])
+        ax += fx
+        ay += fy
+        az += fz
+    for j in range(i + 1, pos.shape[0]):
+        fx, fy, fz = _pull_components(pos, i, j, mass[j])
+        ax += fx
+        ay += fy
+        az += fz
+    acc[i, 0] = ax
+    acc[i, 1] = ay
+    acc[i, 2] = az
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def rk4_step(pos: np.array, vel: np.array, mass: np.array, dt: float,\
+    n_steps: int = 1):
+    """
+    Advances a system by one or more time steps in place using the RK4 method, 
+    holding the central body at index 0 stationary.
+
+    Parameters
+    ----------
+    - pos (2-d array): An (N, 3) array of the positions of the bodies.
+    - vel (2-d array): An (N, 3) array of the velocities of the bodies.
+    - mass (1-d array): An array of length N of the masses of the bodies.
+    - dt (float): The size of the time step in seconds.
+    - n_steps (int, optional): The number of time steps to take.
+    """
+
+    assert pos.shape[1] == 3
+
+    # The central star never moves, so only the planets are integrated.
+    star_pos = pos[0]
+    mu_star = G * mass[0]
+    p_pos = pos[1:]
+    p_vel = vel[1:]
+    p_mass = mass[1:]
+    m = p_pos.shape[0]
+
+    # Scratch space, allocated once per call: the velocity and position 
+    # increments of the latest stage, their weighted sums over the stages, 
+    # and the accelerations of the current stage.
+    scratch = np.empty((5, m, 3))
+    kv = scratch[0]
+    kx = scratch[1]
+    dv = scratch[2]
+    dx = scratch[3]
+    stage_acc = scratch[4]
+    stage_pos = np.empty((m, 3))
+
+    for _ in range(n_steps):
+        scratch[:4] = 0.0
+        for s in range(4):
+            # Fraction of the previous stage's increment the stage is 
+            # evaluated at. The first stage has no previous stage; its 
+            # coefficient is zero, and the increments start out zeroed.
+            c = _RK4_C[s]
+            w = _RK4_W[s]
+            for i in range(m):
+                for d in range(3):
+                    stage_pos[i, d] = p_pos[i, d] + c * kx[i, d]
+            if m >= PARALLEL_MIN_PLANETS:
+                for i in nb.prange(m):
+                    _planet_accel(i, star_pos, mu_star, stage_pos, p_mass,\
+                        stage_acc)
+            else:
+                _accel_planets(star_pos, mu_star, stage_pos, p_mass,\
+                    stage_acc)
+            # Replace the previous stage's increments with this stage's, and 
+            # accumulate them into the weighted sums.
+            for i in range(m):
+                for d in range(3):
+                    kx[i, d] = (p_vel[i, d] + c * kv[i, d]) * dt
+                    kv[i, d] = stage_acc[i, d] * dt
+                    dv[i, d] += w * kv[i, d]
+                    dx[i, d] += w * kx[i, d]
+
+        for i in range(m):
+            for d in range(3):
+                p_vel[i, d] += dv[i, d] / 6
+                p_pos[i, d] += dx[i, d] / 6
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def verlet_step(pos: np.array, vel: np.array, acc: np.array, mass: np.array,\
+    dt: float, n_steps: int = 1):
+    """
+    Advances a system by one or more time steps in place using the 
+    kick-drift-kick form of the velocity Verlet method, holding the central 
+    body at index 0 stationary. The method is symplectic, so the energy error 
+    stays bounded over long integrations, and it needs only one force 
+    evaluation per step.
+
+    Parameters
+    ----------
+    - pos (2-d array): An (N, 3) array of the positions of the bodies.
+    - vel (2-d array): An (N, 3) array of the velocities of the bodies.
+    - acc (2-d array): An (N, 3) array of the accelerations of the bodies at 
+    the start of the first step, updated to the accelerations at the end of 
+    the last.
+    - mass (1-d array): An array of length N of the masses of the bodies.
+    - dt (float): The size of the time step in seconds.
+    - n_steps (int, optional): The number of time steps to take.
+    """
+
+    assert pos.shape[1] == 3
+
+    # The central star never moves, so only the planets are integrated.
+    star_pos = pos[0]
+    mu_star = G * mass[0]
+    p_pos = pos[1:]
+    p_vel = vel[1:]
+    p_acc = acc[1:]
+    p_mass = mass[1:]
+    m = p_pos.shape[0]
+
+    for _ in range(n_steps):
+        # Kick the velocities to v(t+dt/2), then drift the positions to 
+        # x(t+dt).
+        for i in range(m):
+            for d in range(3):
+                p_vel[i, d] += 0.5 * dt * p_acc[i, d]
+                p_pos[i, d] += dt * p_vel[i, d]
+
+        # Compute a(t+dt), then kick the velocities to v(t+dt).
+        if m >= PARALLEL_MIN_PLANETS:
+            for i in nb.prange(m):
+                _planet_accel(i, star_pos, mu_star, p_pos, p_mass, p_acc)
+        else:
+            _accel_planets(star_pos, mu_star, p_pos, p_mass, p_acc)
+        for i in range(m):
+            for d in range(3):
+                p_vel[i, d] += 0.5 * dt * p_acc[i, d]
+
+
+@nb.njit(fastmath=True, cache=True)
+def _period(pos: np.array, vel: np.array, i: int, mu: float) -> float:
+    """
+    Computes the orbital period of a body around the central body at index 0.
+
+    Parameters
+    ----------
+    - pos (2-d array): An (N, 3) array of the positions of the bodies.
+    - vel (2-d array): An (N, 3) array of the velocities of the bodies.
+    - i (int): The index of the orbiting body.
+    - mu (float): The standard gravitational parameter of the central body.
+
+    Returns
+    -------
+    - T (float): The orbital period of the orbiting body in seconds.
+    """
+
+    # Relative position and velocity, in double precision.
+    dx = float(pos[i, 0]) - float(pos[0, 0])
+    dy = float(pos[i, 1]) - float(pos[0, 1])
+    dz = float(pos[i, 2]) - float(pos[0, 2])
+    dvx = float(vel[i, 0]) - float(vel[0, 0])
+    dvy = float(vel[i, 1]) - float(vel[0, 1])
+    dvz = float(vel[i, 2]) - float(vel[0, 2])
+    r = np.sqrt(dx * dx + dy * dy + dz * dz)
+    v2 = dvx * dvx + dvy * dvy + dvz * dvz
+
+    # Semi-major axis from the vis-viva equation.
+    a = abs(1.0 / (2.0 / r - v2 / mu))
+
+    return 2 * pi * np.sqrt(a * a * a / mu)
+
+
+@nb.njit(fastmath=True, cache=True)
+def trojan_periods(pos: np.array, vel: np.array, mass: np.array, t0: int,\
+    t1: int) -> Tuple[float, float]:
+    """
+    Computes the orbital periods of the members of a Trojan pair around the 
+    central star at index 0. Matches CelestialBody.period without going 
+    through the Python objects.
+
+    Parameters
+    ----------
+    - pos (2-d array): An (N, 3) array of the positions of the bodies.
+    - vel (2-d array): An (N, 3) array of the velocities of the bodies.
+    - mass (1-d array): An array of length N of the masses of the bodies.
+    - t0 (int): The index of one member of the Trojan pair.
+    - t1 (int): The index of the other member of the Trojan pair.
+
+    Returns
+    -------
+    - P1 (float): The orbital period of the body at t0 in seconds.
+    - P2 (float): The orbital period of the body at t1 in seconds.
+    """
+
+    mu = G * mass[0]
+
+    return _period(pos, vel, t0, mu), _period(pos, vel, t1, mu)
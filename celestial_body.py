@@ -1,5 +1,7 @@
 from enum import Enum
+from math import pi, sqrt
 import numpy as np
+from typing import Tuple
 
 
 # Newton's Gravitational Constant.
@@ -30,18 +32,155 @@ class CelestialBody:
     - velocity (1-d array): A 3-d vector of the form [vx, vy, vz] 
     representing the initial velocity of the body in the x, y, and z 
     directions.
+
+    Once a body is bound to a System, its type, trojan flag, mass, radius, 
+    position, velocity, and acceleration are views into the System's arrays 
+    rather than values held by the body itself.
     """
 
     def __init__(self, type: CelestialType, trojan: bool, name: str,\
         mass: float, radius: float, position: np.array, velocity: np.array):
-        self.type: CelestialType = type
-        self.trojan: bool = trojan
         self.name: str = name
-        self.mass: float = mass
-        self.radius: float = radius
-        self.position: np.array = position
-        self.velocity: np.array = velocity
-        self.acceleration: np.array = np.zeros(3)
+        # The System holding the body's state, and the body's index within it.
+        self._system = None
+        self._index: int = -1
+        # State used until the body is bound to a System.
+        self._type: CelestialType = type
+        self._trojan: bool = trojan
+        self._mass: float = mass
+        self._radius: float = radius
+        self._position: np.array = position
+        self._velocity: np.array = velocity
+        self._acceleration: np.array = np.zeros(3)
+
+
+    def bind(self, system, index: int):
+        """
+        Copies the body's state into a System and makes the body a view of 
+        that System's arrays at the given index.
+
+        Parameters
+        ----------
+        - system (System): The system the body belongs to.
+        - index (int): The index of the body within the system's arrays.
+        """
+
+        system.type[index] = self.type.value
+        system.trojan[index] = self.trojan
+        system.mass[index] = self.mass
+        system.radius[index] = self.radius
+        system.pos[index] = self.position
+        system.vel[index] = self.velocity
+        system.acc[index] = self.acceleration
+        system.bodies[index] = self
+
+        self._system = system
+        self._index = index
+
+
+    @property
+    def type(self) -> CelestialType:
+        if self._system is None:
+            return self._type
+        return CelestialType(self._system.type[self._index])
+
+
+    @type.setter
+    def type(self, value: CelestialType):
+        if self._system is None:
+            self._type = value
+        else:
+            self._system.type[self._index] = value.value
+
+
+    @property
+    def trojan(self) -> bool:
+        if self._system is None:
+            return self._trojan
+        return bool(self._system.trojan[self._index])
+
+
+    @trojan.setter
+    def trojan(self, value: bool):
+        if self._system is None:
+            self._trojan = value
+        else:
+            self._system.trojan[self._index] = value
+
+
+    @property
+    def mass(self) -> float:
+        if self._system is None:
+            return self._mass
+        return self._system.mass[self._index]
+
+
+    @mass.setter
+    def mass(self, value: float):
+        if self._system is None:
+            self._mass = value
+        else:
+            self._system.mass[self._index] = value
+
+
+    @property
+    def radius(self) -> float:
+        if self._system is None:
+            return self._radius
+        return self._system.radius[self._index]
+
+
+    @radius.setter
+    def radius(self, value: float):
+        if self._system is None:
+            self._radius = value
+        else:
+            self._system.radius[self._index] = value
+
+
+    @property
+    def position(self) -> np.array:
+        if self._system is None:
+            return self._position
+        return self._system.pos[self._index]
+
+
+    @position.setter
+    def position(self, value: np.array):
+        if self._system is None:
+            self._position = value
+        else:
+            self._system.pos[self._index] = value
+
+
+    @property
+    def velocity(self) -> np.array:
+        if self._system is None:
+            return self._velocity
+        return self._system.vel[self._index]
+
+
+    @velocity.setter
+    def velocity(self, value: np.array):
+        if self._system is None:
+            self._velocity = value
+        else:
+            self._system.vel[self._index] = value
+
+
+    @property
+    def acceleration(self) -> np.array:
+        if self._system is None:
+            return self._acceleration
+        return self._system.acc[self._index]
+
+
+    @acceleration.setter
+    def acceleration(self, value: np.array):
+        if self._system is None:
+            self._acceleration = value
+        else:
+            self._system.acc[self._index] = value
 
 
     def angular_momentum(self, central: 'CelestialBody') -> np.array:
@@ -65,7 +204,8 @@ class CelestialBody:
         # Relative velocity vector.
         v = self.velocity - central.velocity
         
-        h = np.cross(r, v)
+        h = np.array([r[1] * v[2] - r[2] * v[1], r[2] * v[0] - r[0] * v[2],\
+            r[0] * v[1] - r[1] * v[0]])
 
         return h
 
@@ -85,39 +225,42 @@ class CelestialBody:
         - e (float): The eccentricity of the body's orbit around a central body.
         """
 
-        # Specific orbital energy.
-        epsilon = self.specific_orbital_energy(central)
-        # Standard gravitational parameter.
-        mu = self.standard_gravitational_parameter(central)
+        # Standard gravitational parameter and specific orbital energy.
+        mu, epsilon, _ = self.orbital_parameters(central)
         # Magnitude of the specific relative angular momentum.
-        h = np.linalg.norm(self.angular_momentum(central))
+        h = self.angular_momentum(central)
+        h = sqrt(h[0] * h[0] + h[1] * h[1] + h[2] * h[2])
 
-        e = np.sqrt(1 + (2 * epsilon * (h ** 2) / (mu ** 2)))
+        # Rounding can push the radicand of a circular orbit slightly below 
+        # zero, which math.sqrt would reject.
+        e = sqrt(max(0.0, 1 + (2 * epsilon * (h ** 2) / (mu ** 2))))
 
         return e
 
 
-    def period(self, central: 'CelestialBody') -> float:
+    def period(self, central: 'CelestialBody', mu: float = None) -> float:
         """
         Computes the orbital period of the body relative to a given stationary 
         central body.
 
-        Parameter
-        ---------
+        Parameters
+        ----------
         - central (CelestialBody): The central body of significantly larger 
         mass around which the body orbits.
+        - mu (float, optional): A precomputed standard gravitational parameter 
+        relative to the central body.
 
         Returns
         -------
         - T (float): The orbital period of the orbiting body.
         """
 
+        # Standard gravitational parameter and specific energy.
+        mu, epsilon, _ = self.orbital_parameters(central, mu)
         # Semi-major axis.
-        a = abs(self.semimajor_axis(central))
-        # Standard gravitational parameter.
-        mu = (self.standard_gravitational_parameter(central))
+        a = abs(mu / (2 * epsilon))
 
-        T = 2 * np.pi * np.sqrt((a ** 3) / mu)
+        T = 2 * pi * sqrt((a ** 3) / mu)
 
         return T
 
@@ -137,27 +280,23 @@ class CelestialBody:
         body.
         """
 
-        # Orbital distance.
-        r = np.linalg.norm(self.position - central.position)
-        # Relative orbital speed.
-        v = np.linalg.norm(self.velocity - central.velocity)
-        # Standard gravitational parameter.
-        mu = self.standard_gravitational_parameter(central)
-
-        epsilon = ((v ** 2) / 2) - (mu / r)
+        _, epsilon, _ = self.orbital_parameters(central)
 
         return epsilon
 
 
-    def semimajor_axis(self, central: 'CelestialBody') -> float:
+    def semimajor_axis(self, central: 'CelestialBody', mu: float = None)\
+        -> float:
         """
         Computes the semi-major axis of the body's orbit around the system's 
         central body.
 
-        Parameter
-        ---------
+        Parameters
+        ----------
         - central (CelestialBody): The central body of significantly larger 
         mass around which the body orbits.
+        - mu (float, optional): A precomputed standard gravitational parameter 
+        relative to the central body.
 
         Returns
         -------
@@ -165,10 +304,8 @@ class CelestialBody:
         central body.
         """
 
-        # Standard gravitational parameter.
-        mu = self.standard_gravitational_parameter(central)
-        # Specific energy.
-        epsilon = self.specific_orbital_energy(central)
+        # Standard gravitational parameter and specific energy.
+        mu, epsilon, _ = self.orbital_parameters(central, mu)
 
         a = -(mu / (2 * epsilon))
 
@@ -194,3 +331,46 @@ class CelestialBody:
         mu = G * central.mass
 
         return mu
+
+
+    def orbital_parameters(self, central: 'CelestialBody', mu: float = None)\
+        -> Tuple[float, float, float]:
+        """
+        Computes the standard gravitational parameter, specific orbital energy, 
+        and orbital distance of the body relative to a central body in a 
+        single pass.
+
+        Parameters
+        ----------
+        - central (CelestialBody): The central body of significantly larger 
+        mass around which the body orbits.
+        - mu (float, optional): The standard gravitational parameter relative 
+        to the central body. Computed from the central body's mass if not 
+        given; callers evaluating many orbits around the same body can pass a 
+        precomputed value.
+
+        Returns
+        -------
+        - mu (float): The standard gravitational parameter of the two masses.
+        - epsilon (float): The specific orbital energy relative to the passed 
+        body.
+        - r (float): The distance between the body and the passed body.
+        """
+
+        # Relative position and velocity vectors, promoted to double precision 
+        # in case the state is stored as 32-bit floats.
+        dr = self.position.astype(np.float64)\
+            - central.position.astype(np.float64)
+        dv = self.velocity.astype(np.float64)\
+            - central.velocity.astype(np.float64)
+        # Orbital distance.
+        r = sqrt(dr[0] * dr[0] + dr[1] * dr[1] + dr[2] * dr[2])
+        # Square of the relative orbital speed.
+        v2 = dv[0] * dv[0] + dv[1] * dv[1] + dv[2] * dv[2]
+        # Standard gravitational parameter.
+        if mu is None:
+            mu = self.standard_gravitational_parameter(central)
+
+        epsilon = (v2 / 2) - (mu / r)
+
+        return mu, epsilon, r
@@ -0,0 +1,43 @@
+"""
+Compiles the step and period kernels ahead of time into the nbody_kernels
+extension module, so that runs of trojan_exoplanets.py don't have to wait for
+Numba to compile them. Run once, from this directory, after changing
+_kernels.py:
+
+    python compile_kernels.py
+
+The compiled kernels only take double precision arrays and run serially, so
+trojan_exoplanets.py falls back to the JIT kernels in _kernels.py for 32-bit
+systems and for systems large enough to benefit from the parallel force loop.
+It also falls back if the module was built from a different _kernels.py.
+"""
+
+import os
+from numba.pycc import CC
+
+from _kernels import rk4_step, source_hash, trojan_periods, verlet_step
+
+
+cc = CC("nbody_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Record the hash of the source the kernels are compiled from, so that stale 
+# builds can be detected.
+SOURCE_HASH = source_hash()
+
+
+@cc.export("source_hash", "i8()")
+def _source_hash() -> int:
+    return SOURCE_HASH
+
+
+cc.export("rk4_step", "void(f8[:,:], f8[:,:], f8[:], f8, i8)")\
+    (rk4_step.py_func)
+cc.export("verlet_step", "void(f8[:,:], f8[:,:], f8[:,:], f8[:], f8, i8)")\
+    (verlet_step.py_func)
+cc.export("trojan_periods",\
+    "UniTuple(f8, 2)(f8[:,:], f8[:,:], f8[:], i8, i8)")(trojan_periods.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
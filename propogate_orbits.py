@@ -1,7 +1,7 @@
 import numpy as np
-from scipy.integrate import solve_ivp
 from typing import List
 
+from _kernels import g, rk4_step, verlet_step
 from celestial_body import CelestialBody
 
 
@@ -9,108 +9,151 @@ from celestial_body import CelestialBody
 G = 6.67430e-11
 
 
-def g(index: int, pos: np.array, bodies: List[CelestialBody]):
+class System:
     """
-    Computes the acceleration due to gravity on a given body as a combination 
-    of many other celestial bodies.
+    Structure-of-arrays representation of the state of an n-body system. 
+    Besides the integrated state, the system holds the radius, type (as the 
+    value of a CelestialType), and Trojan flag of each body, which are filled 
+    in as bodies are bound to it.
+
+    Constructor Parameters
+    ----------------------
+    - pos (2-d array): An (N, 3) array of the position vectors of the bodies 
+    in meters.
+    - vel (2-d array): An (N, 3) array of the velocity vectors of the bodies 
+    in meters/second.
+    - mass (1-d array): An array of length N of the masses of the bodies in 
+    kilograms.
+    - dtype (data type): The floating point type of the position, velocity, 
+    and acceleration arrays. Defaults to np.float64; np.float32 halves the 
+    memory traffic of the integrator at the cost of precision. Masses are 
+    always stored as np.float64.
+    """
+
+    def __init__(self, pos: np.array, vel: np.array, mass: np.array,\
+        dtype: type = np.float64):
+        self.pos: np.array = np.ascontiguousarray(pos, dtype=dtype)
+        self.vel: np.array = np.ascontiguousarray(vel, dtype=dtype)
+        self.mass: np.array = np.ascontiguousarray(mass, dtype=np.float64)
+        self.acc: np.array = np.zeros_like(self.pos)
+        self.radius: np.array = np.zeros(len(self.mass))
+        self.type: np.array = np.zeros(len(self.mass), dtype=np.int8)
+        self.trojan: np.array = np.zeros(len(self.mass), dtype=bool)
+        # The CelestialBody views bound to each index of the arrays.
+        self.bodies: List[CelestialBody] = [None] * len(self.mass)
+
+
+    def swap(self, i: int, j: int):
+        """
+        Swaps the bodies at two indices of the system.
+
+        Parameters
+        ----------
+        - i (int): The index of one body.
+        - j (int): The index of the other body.
+        """
+
+        for arr in (self.pos, self.vel, self.mass, self.acc, self.radius,\
+            self.type, self.trojan):
+            arr[[i, j]] = arr[[j, i]]
+        self.bodies[i], self.bodies[j] = self.bodies[j], self.bodies[i]
+        if self.bodies[i] is not None:
+            self.bodies[i]._index = i
+        if self.bodies[j] is not None:
+            self.bodies[j]._index = j
+
+
+    def accel(self, i: int, pos: np.array) -> np.array:
+        """
+        Computes the acceleration due to gravity on a given body of the system 
+        as if it were at the given position.
+
+        Parameters
+        ----------
+        - i (int): The index of the body whose acceleration is to be computed.
+        - pos (1-d array): A 3-d vector of the position of the body.
+
+        Returns
+        -------
+        - g (1-d array): The acceleration vector of the body.
+        """
+
+        return g(i, pos, self.pos, self.mass)
+
+
+def accel_all(pos_all: np.array, mass: np.array) -> np.array:
+    """
+    Computes the acceleration due to gravity on every body in a system at once.
 
     Parameters
     ----------
-    - index (int): The index of the celestial body whose acceleration is to be 
-    computed.
-    - pos (1-d array): A 3-d vector of the position of the body at index i.
-    - bodies (list of CelestialBody objects): A list of all the bodies in the 
-    system, where the first object in the list is the central star.
+    - pos_all (2-d array): An (N, 3) array of the positions of the bodies.
+    - mass (1-d array): An array of length N of the masses of the bodies.
 
     Returns
     -------
-    - g (1-d array): The acceleration vector of main.
+    - a (2-d array): An (N, 3) array of the acceleration vectors of the bodies, 
+    in the floating point type of pos_all.
     """
 
-    # Compute the sum total of the accelerations from the other bodies.
-    g = np.zeros(3)
-    for i, body in enumerate(bodies):
-        # Skip main when iterating over the list.
-        if i != index:
-            # Relative position.
-            r = pos - body.position
-            # Contribution to main's acceleration.
-            g -= G * body.mass * r / (np.linalg.norm(r) ** 3)
+    # Work in double precision even if the positions are stored as 32-bit 
+    # floats, where the inverse cube distances would underflow.
+    dtype = pos_all.dtype
+    pos_all = pos_all.astype(np.float64, copy=False)
+
+    # Compute the force between each pair of bodies only once, and apply it 
+    # to both bodies per Newton's third law.
+    i, j = np.triu_indices(len(mass), k=1)
+    diff = pos_all[i] - pos_all[j]
+    r2 = np.einsum('ij,ij->i', diff, diff)
+    f = G * (1.0 / (r2 * np.sqrt(r2)))[:, None] * diff
+
+    a = np.zeros_like(pos_all)
+    np.add.at(a, i, -f * mass[j, None])
+    np.add.at(a, j, f * mass[i, None])
 
-    return g
+    return a.astype(dtype, copy=False)
 
 
-def propogate_Runge_Kutta(bodies: List[CelestialBody], time_step: float)\
-    -> List[CelestialBody]:
+def propogate_Runge_Kutta(system: System, time_step: float) -> System:
     """
     Propogates the orbits of bodies in a planetary system around a single fixed 
     central star.
 
     Parameters
     ----------
-    - bodies (list of CelestialBody objects): A list of all the celestial 
-    bodies in the system, where the first object in the list is the central 
-    star.
+    - system (System): The state of the system, where the body at index 0 is 
+    the central star.
     - time_step (float): The size of the time step in seconds.
 
     Returns
     -------
-    - bodies (list of CelestialBody objects): The input bodies, updated with 
-    new positions and velocities.
+    - system (System): The input system, updated with new positions and 
+    velocities.
     """
 
-    # Update the position and velocity of each body in the list.
-    for i, body in enumerate(bodies):
-        # The central body in the 0th position is assumed to be stationary.
-        if i != 0:
-            # Use RK4 method to update the velocity and position.
-            k1v = g(i, body.position, bodies) * time_step
-            k1x = body.velocity * time_step
-            k2v = g(i, body.position + k1x / 2, bodies) * time_step
-            k2x = (body.velocity + k1v / 2) * time_step
-            k3v = g(i, body.position + k2x / 2, bodies) * time_step
-            k3x = (body.velocity + k2v / 2) * time_step
-            k4v = g(i, body.position + k3x, bodies) * time_step
-            k4x = (body.velocity + k3v) * time_step
-            body.velocity += (k1v + (2 * k2v) + (2 * k3v) + k4v) / 6
-            body.position += (k1x + (2 * k2x) + (2 * k3x) + k4x) / 6
-            body.acceleration = g(i, body.position, bodies)
-
-    return bodies
-
-
-def propogate_Verlet(bodies: List[CelestialBody], time_step: float)\
-    -> List[CelestialBody]:
+    rk4_step(system.pos, system.vel, system.mass, time_step)
+
+    return system
+
+
+def propogate_Verlet(system: System, time_step: float) -> System:
     """
     Uses the Verlet method of numerical integration to propogate the bodies in 
     a given n-body system.
 
     Parameters
     ----------
-    - bodies (list of CelestialBody objects): A list of all the celestial 
-    bodies in the system, where the first object in the list is the central 
-    star.
+    - system (System): The state of the system, where the body at index 0 is 
+    the central star.
     - time_step (float): The size of the time step in seconds.
 
     Returns
     -------
-    - bodies (list of CelestialBody objects): The input bodies, updated with 
-    new positions and velocities.
+    - system (System): The input system, updated with new positions and 
+    velocities.
     """
 
-    # Update the position and velocity of each body in the list.
-    for i, body in enumerate(bodies):
-        # Skip the central body in the 0th position.
-        if i != 0:
-            # Use the Velocity Verlet method.
-            # Update position to x(t+dt).
-            body.position += (body.velocity * time_step)\
-                + (0.5 * body.acceleration * time_step * time_step)
-            # Compute a(t+dt).
-            acc = g(i, body.position, bodies)
-            # Update velocity to v(t+dt).
-            body.velocity += 0.5 * (body.acceleration + acc) * time_step
-            # Update acceleration to a(t+dt).
-            body.acceleration = acc
-    
-    return bodies
+    verlet_step(system.pos, system.vel, system.acc, system.mass, time_step)
+
+    return system
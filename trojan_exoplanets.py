@@ -1,11 +1,24 @@
 import argparse
 from enum import Enum
+from math import ceil
 import matplotlib.pyplot as plt
 import numpy as np
 from typing import List, Union
 
+import _kernels
 from celestial_body import CelestialBody, CelestialType
-from propogate_orbits import g, propogate_Runge_Kutta, propogate_Verlet
+from propogate_orbits import System, accel_all
+
+# The kernels compiled ahead of time by compile_kernels.py, if they have been 
+# built from the current _kernels.py.
+try:
+    import nbody_kernels
+    if nbody_kernels.source_hash() != _kernels.source_hash():
+        print("nbody_kernels is out of date; run compile_kernels.py to"\
+            + " rebuild it. Using the JIT kernels instead.")
+        nbody_kernels = None
+except (ImportError, AttributeError):
+    nbody_kernels = None
 
 
 class Integrator(Enum):
@@ -13,6 +26,39 @@ class Integrator(Enum):
     VERLET = 1
 
 
+# Maps the body type specification at the start of a line to its enum member.
+TYPE_MAP = {
+    "STAR": CelestialType.STAR,
+    "GIANT": CelestialType.GIANT,
+    "TERRESTRIAL": CelestialType.TERRESTRIAL,
+}
+
+# Maps each parameter name to a function that parses its value.
+HANDLERS = {
+    "trojan": lambda s: s == "True",
+    "name": str,
+    "mass": float,
+    "radius": float,
+    "position": lambda s: np.fromstring(s, dtype=np.float64, sep=","),
+    "velocity": lambda s: np.fromstring(s, dtype=np.float64, sep=","),
+}
+
+# Columns of a file in the columnar format.
+TABLE_DTYPE = np.dtype([
+    ("type", "U12"),
+    ("trojan", "?"),
+    ("name", "U32"),
+    ("mass", "f8"),
+    ("radius", "f8"),
+    ("px", "f8"),
+    ("py", "f8"),
+    ("pz", "f8"),
+    ("vx", "f8"),
+    ("vy", "f8"),
+    ("vz", "f8"),
+])
+
+
 def parse_line(line: str) -> CelestialBody:
     """
     Parses a single line of text to produce a CelestialBody object.
@@ -28,127 +74,158 @@ def parse_line(line: str) -> CelestialBody:
     parameters given by the input line.
     """
 
-    params: List[str] = line.split(" ")
-    
-    # Variables used to construct the CelestialBody object.
-    body_type: CelestialType = -1
-    body_is_trojan: bool = False
-    body_name: str = ""
-    body_mass: float = 0.0
-    body_radius: float = 0.0
-    body_position: np.array = np.zeros(3)
-    body_velocity: np.array = np.zeros(3)
+    params: List[str] = line.split()
+
+    # Each line should start by specifying the body type.
+    try:
+        body_type = TYPE_MAP[params[0]]
+    except (KeyError, IndexError):
+        raise Exception("Each line must start with a valid object type"\
+            + " specification.")
+
+    # Parameters used to construct the CelestialBody object. Any that are 
+    # missing from the line keep these defaults. Vectors are only allocated 
+    # once we know whether the line gives them.
+    attrs = {
+        "trojan": False,
+        "name": "",
+        "mass": 0.0,
+        "radius": 0.0,
+        "position": None,
+        "velocity": None,
+    }
 
     # The parsing function cannot detect missing parameters.
-    for i, param in enumerate(params):
-        if i == 0:
-            # Each line should start by specifying the body type.
-            if params[0] == "STAR":
-                body_type = CelestialType.STAR
-            elif params[0] == "GIANT":
-                body_type = CelestialType.GIANT
-            elif params[0] == "TERRESTRIAL":
-                body_type = CelestialType.TERRESTRIAL
-            else:
-                raise Exception("Each line must start with a valid object type"\
-                    + " specification.")
-        else:
-            tokens = param.split("=")
-            if tokens[0] == "trojan":
-                body_is_trojan = tokens[1] == "True"
-            elif tokens[0] == "name":
-                body_name = tokens[1]
-            elif tokens[0] == "mass":
-                body_mass = float(tokens[1])
-            elif tokens[0] == "radius":
-                body_radius = float(tokens[1])
-            elif tokens[0] == "position":
-                vals = tokens[1].split(",")
-                if len(vals) != 3:
-                    raise Exception("Position must be specified by three"\
-                        + " comma-separated floats")
-                body_position = np.array([float(vals[0]), float(vals[1]),\
-                    float(vals[2])])
-            elif tokens[0] == "velocity":
-                vals = tokens[1].split(",")
-                if len(vals) != 3:
-                    raise Exception("Velocity must be specified by three"\
-                        + " comma-separated floats")
-                body_velocity = np.array([float(vals[0]), float(vals[1]),\
-                    float(vals[2])])
-            else:
-                raise Exception("Invalid token detected while parsing input"\
-                    + " file.")
-
-    body = CelestialBody(type=body_type, trojan=body_is_trojan, name=body_name,\
-        mass=body_mass, radius=body_radius, position=body_position,\
-        velocity=body_velocity)
+    for kv in params[1:]:
+        k, _, v = kv.partition("=")
+        try:
+            attrs[k] = HANDLERS[k](v)
+        except KeyError:
+            raise Exception("Invalid token detected while parsing input"\
+                + " file.")
+
+    if attrs["position"] is None:
+        attrs["position"] = np.zeros(3)
+    elif attrs["position"].size != 3:
+        raise Exception("Position must be specified by three"\
+            + " comma-separated floats")
+    if attrs["velocity"] is None:
+        attrs["velocity"] = np.zeros(3)
+    elif attrs["velocity"].size != 3:
+        raise Exception("Velocity must be specified by three"\
+            + " comma-separated floats")
+
+    body = CelestialBody(type=body_type, **attrs)
 
     return body
     
 
-def parse_system(file: str) -> Union[list, list]:
+def parse_table(lines: List[str], dtype: type = np.float64) -> System:
+    """
+    Parses the lines of a file in the columnar format to produce a System in 
+    a single pass.
+
+    Parameters
+    ----------
+    - lines (list of strings): The lines of the file. Lines starting with "#" 
+    are comments, and every other line holds the whitespace-separated columns 
+    of one body, in the order of TABLE_DTYPE.
+    - dtype (data type): The floating point type of the system's position, 
+    velocity, and acceleration arrays.
+
+    Returns
+    -------
+    - system (System): The state of the system, with a CelestialBody view for 
+    each body.
+    """
+
+    data = np.atleast_1d(np.genfromtxt(lines, dtype=TABLE_DTYPE,\
+        comments="#"))
+
+    pos = np.stack([data["px"], data["py"], data["pz"]], axis=1)
+    vel = np.stack([data["vx"], data["vy"], data["vz"]], axis=1)
+    system = System(pos, vel, data["mass"], dtype=dtype)
+
+    for i, row in enumerate(data):
+        if row["type"] not in TYPE_MAP:
+            raise Exception("Each line must start with a valid object type"\
+                + " specification.")
+        body = CelestialBody(type=TYPE_MAP[row["type"]],\
+            trojan=bool(row["trojan"]), name=str(row["name"]),\
+            mass=float(row["mass"]), radius=float(row["radius"]),\
+            position=system.pos[i], velocity=system.vel[i])
+        body.bind(system, i)
+
+    return system
+
+
+def parse_system(file: str, dtype: type = np.float64)\
+    -> Union[System, list]:
     """
     Initializes the starting conditions of the simulation from a file with the 
     given name.
 
-    Parameter
-    ---------
+    Parameters
+    ----------
     - file (string): The name of the file to parse from.
+    - dtype (data type): The floating point type of the system's position, 
+    velocity, and acceleration arrays.
 
     Returns
     -------
-    - bodies (list of CelestialBody objects): A list of celestial bodies in the 
-    system, initialized with position, velocity, mass, and radius.
-    - trojans (2-tuple of ints): The list indices of the Trojan pair.
+    - system (System): The state of the system, initialized with position, 
+    velocity, and mass, with a CelestialBody view for each body.
+    - trojans (2-tuple of ints): The indices of the Trojan pair.
     """
 
-    infile = open(file, "r")
-
-    bodies: List[CelestialBody] = list()
-
-    lines: List[str] = infile.readlines()
-    star_count = 0
-    trojan_count = 0
-    trojans = [0, 0]
-    for i, line in enumerate(lines):
-        body = parse_line(line)
-        # Keep track of the number of stars in the system.
-        if body.type == CelestialType.STAR:
-            star_count += 1
-        # Keep track of the number of trojans in the system, and store the 
-        # indices of the Trojan pair.
-        if body.trojan:
-            trojans[trojan_count] = i
-            trojan_count += 1
-        # We only want to work with single-star systems.
-        if star_count > 1:
-            raise Exception("Multi-star systems are not allowed.")
-        bodies.append(body)
+    with open(file, "r") as infile:
+        lines: List[str] = infile.readlines()
+
+    if lines and lines[0].startswith("#"):
+        # Files starting with a comment line use the columnar format.
+        system = parse_table(lines, dtype)
+    else:
+        # Preallocate the system's arrays, to be filled in as the lines are 
+        # parsed.
+        system = System(np.zeros((len(lines), 3)), np.zeros((len(lines), 3)),\
+            np.zeros(len(lines)), dtype=dtype)
+        for i, line in enumerate(lines):
+            parse_line(line).bind(system, i)
+
+    # Find the star and the Trojan pair from the system's type and Trojan 
+    # arrays.
+    star_indices = np.flatnonzero(system.type == CelestialType.STAR.value)
+    trojan_indices: List[int] = np.flatnonzero(system.trojan).tolist()
+    # We only want to work with single-star systems.
+    if len(star_indices) > 1:
+        raise Exception("Multi-star systems are not allowed.")
     # We only want to have one Trojan pair at a time.
-    if trojan_count != 2:
+    if len(trojan_indices) != 2:
         raise Exception("The system must have a single Trojan pair.")
 
-    # Put the star in the front of the list, if necessary.
-    if bodies[0].type != CelestialType.STAR:
-        for i in range(len(bodies)):
-            if bodies[i].type == CelestialType.STAR:
-                bodies[0], bodies[i] = bodies[i], bodies[0]
+    # Put the star in the front of the system, if necessary, and follow any 
+    # Trojan that moves as a result, including the star itself.
+    star_idx = int(star_indices[0]) if len(star_indices) else -1
+    if star_idx > 0:
+        system.swap(0, star_idx)
+        moved = {0: star_idx, star_idx: 0}
+        trojan_indices = [moved.get(i, i) for i in trojan_indices]
 
-    return bodies, trojans
+    trojans = tuple(trojan_indices)
 
+    return system, trojans
 
-def check_margins(trojan1: CelestialBody, trojan2: CelestialBody,\
-    central: CelestialBody, margin: float) -> bool:
+
+def periods_in_margin(P1: float, P2: float, margin: float) -> bool:
     """
-    Checks to see if two planets in a Trojan pair are within a given percent 
-    margin of a 1:1 period resonance.
+    Checks to see if two orbital periods are within a given percent margin of a 
+    1:1 resonance.
 
     Parameters
     ----------
-    - trojan1 (CelestialBody): One member of the co-orbital pair.
-    - trojan2 (CelestialBody): The other member of the co-orbital pair.
-    - central (CelestialBody): The central body in the system.
+    - P1 (float): The orbital period of one member of the co-orbital pair.
+    - P2 (float): The orbital period of the other member of the co-orbital 
+    pair, in the same units as P1.
     - margin (float): The allowed percent deviation from a 1:1 period resonance.
 
     Returns
@@ -156,17 +233,11 @@ def check_margins(trojan1: CelestialBody, trojan2: CelestialBody,\
     - in_margin (bool): True if within the margin, false if not.
     """
 
-    # Get the orbital periods of each planet.
-    P1 = trojan1.period(central)
-    P2 = trojan2.period(central)
-
-    # Compute the percent difference between the periods.
-    diff = abs(P1 - P2)
-    avg = np.average([P1, P2])
-    p_diff = (diff / avg) * 100
+    # Compute the percent difference between the periods, relative to their 
+    # mean.
+    p_diff = abs(P1 - P2) * 200.0 / (P1 + P2)
 
-    # Will return true if the percent difference exceeds the margin.
-    return not (p_diff > margin)
+    return p_diff <= margin
 
 
 def plot_periods(t: np.array, p1: np.array, p1_name: str, p2: np.array,\
@@ -195,90 +266,155 @@ def plot_periods(t: np.array, p1: np.array, p1_name: str, p2: np.array,\
     plt.show()
 
 
-def simulate(bodies: List[CelestialBody], time_step: int,\
-    trojans: list, margin: float, integrator: Integrator, glowscript: bool):
+def simulate(system: System, time_step: int, trojans: list, margin: float,\
+    integrator: Integrator, glowscript: bool, record_every: int = None):
     """
     Takes the parsed parameters and runs a simulation with them.
 
     Parameters
     ----------
-    - bodies (list of CelestialBody objects): A list containing all the bodies 
-    in the system with their initial positions and velocities. The system's 
-    central star should be at position 0.
+    - system (System): The state of the system with the initial positions and 
+    velocities of all its bodies. The system's central star should be at 
+    index 0.
     - time_step (int): The size of the simulation time step in seconds. The 
     shorter the time step, the more precise the simulation will be, but the 
     longer it will take to complete.
-    - trojans (2-tuple of ints): The indices within the bodies list of the 
+    - trojans (2-tuple of ints): The indices within the system of the 
     co-orbital exoplanets being investigated.
     - margin (float): The percent deviation allowed from a 1:1 resonance 
     between the Trojan planets before the simulation is stopped.
     - integrator (Integrator enum): The integration method to be used.
     - glowscript (bool): If true, the simulation will be visualized in VPython.
+    - record_every (int, optional): When visualizing, the number of time steps 
+    between recorded frames. Defaults to about 60 frames per simulated year.
     """
 
     # Length of a year in seconds.
     YEAR: float = 60 * 60 * 24 * 365.25
     # Length of a day in seconds.
     DAY = 60 * 60 * 24
-    # Time counter (holds time elapsed in seconds).
-    time: float = 0
+    # Number of years between checks of the Trojan pair's margins.
+    CHECK_INTERVAL: int = 100
+    # Step counter (counts number of time steps taken).
+    step_idx: int = 0
     # Year counter (counts number of years elapsed).
     years: int = 0
+    # The step at which the years counter next advances: the first step that 
+    # ends at or after the end of the year.
+    next_year_step: int = ceil(YEAR / time_step)
     # Set to false to end the simulation.
     in_margin: bool = True
+    # The simulation is ended after this many years.
+    max_years: int = int(10e6)
 
     # Arrays to hold the elapsed number of years and the corresponding orbital 
-    # periods to track change over time.
-    t = np.array([])
-    p1 = np.array([])
-    p2 = np.array([])
-
-    # Choose the integration method.
-    propogator = propogate_Verlet
+    # periods to track change over time. Only the first `years` entries are 
+    # filled in.
+    t, p1, p2 = (np.empty(max_years) for _ in range(3))
+
+    # When visualizing, the positions are recorded every `record_every` steps 
+    # into a ring buffer holding the latest `max_frames` frames, rather than 
+    # keeping every step of a run that may last millions of years.
+    max_frames: int = 100000
+    if record_every is None:
+        record_every = max(1, int(YEAR / time_step) // 60)
+    # Number of frames recorded so far, including any overwritten.
+    n_frames: int = 0
+    if glowscript:
+        # VPython is only needed to visualize the simulation. Import it before 
+        # simulating, so a missing dependency fails before any work is done.
+        from visuals import visualize
+        frames = np.empty((max_frames,) + system.pos.shape)
+
+    # Use the ahead-of-time compiled kernels if they have been built and can 
+    # take the system, which saves compiling the kernels on the first step. 
+    # They only take double precision and run serially.
+    kernels = _kernels
+    if nbody_kernels is not None and system.pos.dtype == np.float64 and\
+        len(system.bodies) - 1 < _kernels.PARALLEL_MIN_PLANETS:
+        kernels = nbody_kernels
+
+    # Choose the integration method. The compiled step kernels are driven 
+    # directly on the system's arrays, without going through the propagator 
+    # wrappers on every step.
+    step = kernels.verlet_step
+    state = (system.pos, system.vel, system.acc, system.mass)
     if integrator == Integrator.RK4:
-        propogator = propogate_Runge_Kutta
-    elif integrator == Integrator.VERLET:
-        propogator = propogate_Verlet
+        step = kernels.rk4_step
+        state = (system.pos, system.vel, system.mass)
+    dt = float(time_step)
+
+    bodies: List[CelestialBody] = system.bodies
+    # Bind everything the yearly bookkeeping reads to locals once, rather than 
+    # looking it up every year.
+    t0, t1 = trojans
+    pos, vel, mass = system.pos, system.vel, system.mass
+    periods = kernels.trojan_periods
+    in_margin_year = periods_in_margin
 
     # Initialize the accelerations.
-    for i, body in enumerate(bodies):
-        body.acceleration = g(i, body.position, bodies)
+    system.acc[:] = accel_all(system.pos, system.mass)
 
     while in_margin:
-        # Move the planets (the star stays still) and update the time.
-        bodies = propogator(bodies=bodies, time_step=time_step)
-        time += time_step
-
-        # Round down to get the number of elapsed years. Update the years 
-        # counter if necessary.
-        if int(time / YEAR) > years:
-            years += 1
-            # Update our output arrays appropriately.
-            t = np.append(t, years)
-            p1 = np.append(p1, bodies[trojans[0]].period(bodies[0]) / DAY)
-            p2 = np.append(p2, bodies[trojans[1]].period(bodies[0]) / DAY)
-            # Check once a year to see if the Trojan pair is within margins.
-            in_margin = check_margins(bodies[trojans[0]], bodies[trojans[1]],\
-                bodies[0], margin)
-            # Print a status to indicate the program is working.
-            if years % 1000 == 0:
-                print(f"{years} years elapsed")
-                print(f"P1 = {bodies[trojans[0]].period(bodies[0]) / DAY}")
-                print(f"P2 = {bodies[trojans[1]].period(bodies[0]) / DAY}")
-            # Plot the periods every 10,000 years.
-            if years == 10000:
-                plot_periods(t, p1, bodies[trojans[0]].name, p2,\
-                    bodies[trojans[1]].name)
-
-        # End the loop after a million years.
-        if years >= 10e6:
+        # Move the planets (the star stays still) to the end of the year in a 
+        # single call to the step kernel, and count the steps. When 
+        # visualizing, stop at each step that records a frame on the way.
+        if glowscript:
+            while step_idx < next_year_step:
+                n_steps = min(record_every - step_idx % record_every,\
+                    next_year_step - step_idx)
+                step(*state, dt, n_steps)
+                step_idx += n_steps
+                if step_idx % record_every == 0:
+                    frames[n_frames % max_frames] = pos
+                    n_frames += 1
+        else:
+            step(*state, dt, next_year_step - step_idx)
+            step_idx = next_year_step
+
+        # Update the years counter.
+        years += 1
+        next_year_step = ceil((years + 1) * YEAR / time_step)
+        # Update our output arrays appropriately.
+        P1, P2 = periods(pos, vel, mass, t0, t1)
+        t[years - 1] = years
+        p1[years - 1] = P1 / DAY
+        p2[years - 1] = P2 / DAY
+        # Print a status to indicate the program is working.
+        if years % 1000 == 0:
+            print(f"{years} years elapsed")
+            print(f"P1 = {p1[years - 1]}")
+            print(f"P2 = {p2[years - 1]}")
+        # Plot the periods every 10,000 years.
+        if years == 10000:
+            plot_periods(t[:years], p1[:years], bodies[t0].name,\
+                p2[:years], bodies[t1].name)
+        # Periodically check the periods stored since the last check to see 
+        # if the Trojan pair stayed within margins, stopping at the first year 
+        # in which it did not.
+        if years % CHECK_INTERVAL == 0:
+            for year in range(years - CHECK_INTERVAL + 1, years + 1):
+                if not in_margin_year(p1[year - 1], p2[year - 1], margin):
+                    in_margin = False
+                    years = year
+                    break
+
+        # End the loop after the maximum number of years.
+        if years >= max_years:
             in_margin = False
 
     # After the simulation loop finishes, indicate how long it lasted.
     print(f"\nThe Trojan pair remained stable for {years} years.")
 
     # Plot the change in orbital periods over time.
-    plot_periods(t, p1, bodies[trojans[0]].name, p2, bodies[trojans[1]].name)
+    plot_periods(t[:years], p1[:years], bodies[t0].name, p2[:years],\
+        bodies[t1].name)
+
+    # Play back the recorded frames, oldest first.
+    if glowscript:
+        if n_frames > max_frames:
+            frames = np.roll(frames, -(n_frames % max_frames), axis=0)
+        visualize(system, frames[:n_frames])
 
 
 if __name__ == "__main__":
@@ -298,9 +434,12 @@ if __name__ == "__main__":
     parser.add_argument("-g, --GlowScript", dest="glowscript",\
         action="store_const", const=True, default=False,\
         help="Visualize the simulation using GlowScript")
+    parser.add_argument("-f", "--float32", dest="dtype", action="store_const",\
+        const=np.float32, default=np.float64,\
+        help="Store positions and velocities as 32-bit floats")
     args = parser.parse_args()
 
     # Construct the system from the file, and run the simulation.
-    bodies, trojans = parse_system(args.file)
-    simulate(bodies, args.step, trojans, args.margin, args.integrator,\
+    system, trojans = parse_system(args.file, args.dtype)
+    simulate(system, args.step, trojans, args.margin, args.integrator,\
         args.glowscript)
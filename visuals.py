@@ -2,50 +2,47 @@ import numpy as np
 from typing import List
 import vpython as vp
 
-from celestial_body import CelestialBody, CelestialType
+from propogate_orbits import System
 
 
-def create_vbodies(bodies: List[CelestialBody]) -> List[vp.sphere]:
+# The color and display radius of each type of celestial body, indexed by the 
+# value of its CelestialType.
+_TYPE_COLORS = [vp.color.yellow, vp.color.red, vp.color.green]
+_TYPE_RADII = np.array([10e8, 10e7, 10e6])
+
+
+def create_vbodies(system: System) -> List[vp.sphere]:
     """
-    Creates a list of VPython objects from a list of CelestialBody objects.
+    Creates a list of VPython objects from the bodies of a system.
 
     Parameters
     ----------
-    - bodies (list of CelestialBody objects): The bodies in the system.
+    - system (System): The system whose bodies are to be displayed.
 
     Returns
     -------
     - vbodies (list of VPython objects): A list of VPython objects representing 
-    the bodies in the CelestialBody list.
+    the bodies of the system, in the order of the system's arrays.
     """
 
-    vbodies = [vp.sphere() for i in len(bodies)]
+    vbodies: List[vp.sphere] = []
+
+    # Look up the display radius of every body at once, and convert the 
+    # positions to Python floats in one pass.
+    radii = _TYPE_RADII[system.type].tolist()
+    positions = system.pos.tolist()
 
     # Create the planets.
-    for i, body in enumerate(bodies):
-        position = vp.vector(body.position[0], body.position[1],\
-            body.position[2])
-        color = vp.color.blue
-        radius = 0
-        if body.type == CelestialType.STAR:
-            color = vp.color.yellow
-            radius = 10e8
-        elif body.type == CelestialType.GIANT:
-            color = vp.color.red
-            radius = 10e7
-        elif body.type == CelestialType.TERRESTRIAL:
-            color = vp.color.green
-            radius = 10e6
-        vbodies[i] = vp.sphere(pos=position, radius=radius, color=color,\
-            make_trail=True)
+    for (x, y, z), t, radius in zip(positions, system.type.tolist(), radii):
+        vbodies.append(vp.sphere(pos=vp.vector(x, y, z), radius=radius,\
+            color=_TYPE_COLORS[t], make_trail=True))
     
     return vbodies
 
 
-def update_vbodies(vbodies: List[vp.sphere], positions: np.array)\
-    -> List[vp.sphere]:
+def update_vbodies(vbodies: List[vp.sphere], positions: np.array):
     """
-    Update the VPython objects to the new positions.
+    Update the VPython objects to the new positions in place.
 
     Parameters
     ----------
@@ -53,40 +50,34 @@ def update_vbodies(vbodies: List[vp.sphere], positions: np.array)\
     simulated bodies.
     - positions (2-d array): A list of position vectors corresponding to the 
     bodies in vbodies.
-
-    Returns
-    -------
-    - vbodies (list of VPython objects): The updated list of VPython 
-    representations.
     """
 
-    for i, vbody in enumerate(vbodies):
-        new_pos = positions[i]
-        pos_vec = vp.vec(new_pos[0], new_pos[1], new_pos[2])
-        vbody.pos = pos_vec
+    # Convert the frame to Python floats in one pass, then update the 
+    # components of each existing position vector in place rather than 
+    # allocating a new vector per body.
+    for vbody, (x, y, z) in zip(vbodies, positions.tolist()):
+        vbody.pos.x, vbody.pos.y, vbody.pos.z = x, y, z
 
 
-def visualize(bodies: List[CelestialBody], positions: np.array):
+def visualize(system: System, positions: np.array):
     """
     Uses the results of a simulation to visualize that simulation in VPython.
 
     Parameters
     ----------
-    - bodies (list of CelestialBody objects): The list of celestial bodies used 
-    in the simulation.
-    - times (1-d array): The time points that were simulated.
-    - positions (3-d array): Contains an array of position vectors 
-    corresponding to each time in times.
+    - system (System): The system that was simulated.
+    - positions (3-d array): The frames to play back, each an (N, 3) array of 
+    the positions of the bodies.
     """
 
+    # Make each frame a C-contiguous 2-d slice of double-precision positions.
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+
     # Get a list of VPython objects to represent the simulated bodies.
-    vbodies = create_vbodies(bodies)
-    # Create a counter for the simulation playback.
-    i = 0
-    i_max = len(positions)
+    vbodies = create_vbodies(system)
+    rate = vp.rate
 
     # Visualize the simulation.
-    while i < i_max:
-        vbodies = update_vbodies(vbodies, positions[i])
-        i += 1
-        vp.rate(100)
+    for frame in positions:
+        update_vbodies(vbodies, frame)
+        rate(100)